@@ -1,14 +1,23 @@
 # app/main.py
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from sqlalchemy.orm import Session
 
-from app.routes import accounts, trades, templates
+from app.routes import accounts, trades, templates, jobs, exposure, analytics
 from app.models import models
-from app.database import engine, get_db
+from app.models.archive import init_archive, init_id_sequences
+from app.database import engine, get_db, add_missing_columns, SessionLocal
+from app.utils.jobs import runner
+from app.utils.performance_cube import queue_missing_cubes
+
+# Create the archive first so new connections can attach it
+init_archive()
 
 # Create the database tables
 models.Base.metadata.create_all(bind=engine)
+add_missing_columns(models.Trade.__table__)
+init_id_sequences()
 
 app = FastAPI(title="Gold Trading Journal API")
 
@@ -29,11 +38,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses above ~1KB, e.g. full trade lists with analysis blobs
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Include routes
 # Remove the auth router
 app.include_router(accounts.router, prefix="/api/accounts", tags=["Trading Accounts"])
 app.include_router(trades.router, prefix="/api/trades", tags=["Trades"])
 app.include_router(templates.router, prefix="/api/templates", tags=["Templates"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
+app.include_router(exposure.router, prefix="/api/exposure", tags=["Exposure"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
+
+@app.on_event("startup")
+def start_job_runner():
+    runner.start()
+    db = SessionLocal()
+    try:
+        queue_missing_cubes(db)
+    finally:
+        db.close()
+
+@app.on_event("shutdown")
+def stop_job_runner():
+    runner.stop()
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,34 @@
+# app/models/analytics.py
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Float, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+class PerformanceCell(Base):
+    """One cell of the per-user performance cube over closed trades."""
+    __tablename__ = "performance_cube"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "hour", "weekday", "direction", "instrument", "setup", "emotion",
+            name="uq_performance_cube_cell"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    hour = Column(Integer, nullable=False)
+    weekday = Column(Integer, nullable=False)
+    direction = Column(String, nullable=False)
+    instrument = Column(String, nullable=False)
+    setup = Column(String, nullable=False, default="")
+    emotion = Column(String, nullable=False, default="")
+    trade_count = Column(Integer, default=0)
+    total_result = Column(Float, default=0.0)
+    total_result_sq = Column(Float, default=0.0)
+
+class PerformanceCubeBuild(Base):
+    """Marks a user's cube as built from their full history, archive included."""
+    __tablename__ = "performance_cube_builds"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    built_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,81 @@
+# app/models/archive.py
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, event, func, select, update
+
+from app.database import Base, engine, archive_engine, add_missing_columns
+from app.models.models import Trade
+
+# Separate metadata so create_all on the main engine never touches the archive
+archive_metadata = MetaData()
+
+# Mirror of the trades table living in the attached "archive" schema. Rows are
+# copied verbatim, so no defaults, and no foreign keys across database files.
+archived_trades = Table(
+    "trades",
+    archive_metadata,
+    *[
+        Column(column.name, column.type, primary_key=column.primary_key)
+        for column in Trade.__table__.columns
+    ],
+    schema="archive"
+)
+Index("ix_archive_trades_entry_date", archived_trades.c.entry_date)
+Index("ix_archive_trades_account_id", archived_trades.c.account_id)
+
+class IdSequence(Base):
+    """Persistent id high-water mark.
+
+    SQLite hands out max(rowid) + 1, so once the newest trades have been
+    archived or deleted their ids would be reused and collide with the
+    archived copies. Trade ids are allocated from here instead.
+    """
+    __tablename__ = "id_sequences"
+
+    name = Column(String, primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+def init_archive():
+    # Creates the archive file and its schema so it can be attached read-only
+    archive_metadata.create_all(bind=archive_engine)
+    add_missing_columns(archived_trades, bind=archive_engine)
+
+def sync_trade_ids(connection):
+    """Raise the trade sequence past every id in the hot and archived tables."""
+    trades = Trade.__table__
+    sequences = IdSequence.__table__
+
+    high = connection.scalar(select(func.max(trades.c.id))) or 0
+    # Only engine connections have the archive attached, and only once it exists
+    attached = {row[1] for row in connection.exec_driver_sql("PRAGMA database_list")}
+    if "archive" in attached:
+        high = max(high, connection.scalar(select(func.max(archived_trades.c.id))) or 0)
+
+    updated = connection.execute(
+        update(sequences).where(sequences.c.name == "trades").values(
+            next_id=func.max(sequences.c.next_id, high + 1)
+        )
+    ).rowcount
+    if not updated:
+        connection.execute(sequences.insert().values(name="trades", next_id=high + 1))
+
+def init_id_sequences():
+    with engine.begin() as conn:
+        sync_trade_ids(conn)
+
+def next_trade_id(connection) -> int:
+    trades = Trade.__table__
+    sequences = IdSequence.__table__
+
+    # Also stays ahead of rows that were inserted with an explicit id
+    hot_next = select(func.coalesce(func.max(trades.c.id), 0) + 1).scalar_subquery()
+    allocate = update(sequences).where(sequences.c.name == "trades").values(
+        next_id=func.max(sequences.c.next_id, hot_next) + 1
+    )
+    if not connection.execute(allocate).rowcount:
+        sync_trade_ids(connection)
+        connection.execute(allocate)
+    return connection.scalar(select(sequences.c.next_id - 1).where(sequences.c.name == "trades"))
+
+@event.listens_for(Trade, "before_insert")
+def allocate_trade_id(mapper, connection, target):
+    if target.id is None:
+        target.id = next_trade_id(connection)
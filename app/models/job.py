@@ -0,0 +1,31 @@
+# app/models/job.py
+from sqlalchemy import Column, ForeignKey, Integer, String, Float, DateTime, Text, Enum, Boolean
+from sqlalchemy.sql import func
+import enum
+
+from app.database import Base
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    job_type = Column(String, nullable=False)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, index=True)
+    priority = Column(Integer, default=0)
+    progress = Column(Float, default=0.0)
+    params = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)
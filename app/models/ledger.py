@@ -0,0 +1,33 @@
+# app/models/ledger.py
+from sqlalchemy import Column, ForeignKey, Integer, String, Float, DateTime, Enum, Index
+from sqlalchemy.sql import func
+import enum
+
+from app.database import Base
+
+class LedgerEntryType(str, enum.Enum):
+    TRADE_PNL = "trade_pnl"
+    DEPOSIT = "deposit"
+    WITHDRAWAL = "withdrawal"
+    CORRECTION = "correction"
+
+class LedgerEntry(Base):
+    """Append-only record of every change to an account balance.
+
+    balance_after snapshots the running balance as of this entry, so the
+    balance at any moment is one index seek on (account_id, created_at).
+    """
+    __tablename__ = "ledger_entries"
+    __table_args__ = (
+        Index("ix_ledger_entries_account_created", "account_id", "created_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    entry_type = Column(Enum(LedgerEntryType), nullable=False)
+    amount = Column(Float, nullable=False)
+    balance_after = Column(Float, nullable=False)
+    # Not a foreign key: the trade may since have been deleted or archived
+    trade_id = Column(Integer, nullable=True)
+    note = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
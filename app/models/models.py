@@ -18,6 +18,7 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     accounts = relationship("Account", back_populates="owner", cascade="all, delete-orphan")
+    templates = relationship("Template", back_populates="owner", cascade="all, delete-orphan")
 
 class Account(Base):
     __tablename__ = "accounts"
@@ -47,6 +48,7 @@ class Trade(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     account_id = Column(Integer, ForeignKey("accounts.id"))
+    template_id = Column(Integer, ForeignKey("templates.id"), nullable=True, index=True)
     instrument = Column(String, default="XAUUSD")
     entry_price = Column(Float, nullable=False)
     exit_price = Column(Float, nullable=True)
@@ -64,4 +66,4 @@ class Trade(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     account = relationship("Account", back_populates="trades")
-    templates = relationship("Template", back_populates="owner", cascade="all, delete-orphan")
\ No newline at end of file
+    template = relationship("Template", back_populates="trades")
\ No newline at end of file
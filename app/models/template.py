@@ -22,4 +22,20 @@ class Template(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    owner = relationship("User", back_populates="templates")
\ No newline at end of file
+    owner = relationship("User", back_populates="templates")
+    trades = relationship("Trade", back_populates="template")
+    stats = relationship("TemplateStats", uselist=False, cascade="all, delete-orphan")
+
+class TemplateStats(Base):
+    """Running totals over the closed trades linked to a template."""
+    __tablename__ = "template_stats"
+
+    template_id = Column(Integer, ForeignKey("templates.id"), primary_key=True)
+    trade_count = Column(Integer, default=0)
+    win_count = Column(Integer, default=0)
+    total_result = Column(Float, default=0.0)
+    r_count = Column(Integer, default=0)
+    total_r_multiple = Column(Float, default=0.0)
+    hold_count = Column(Integer, default=0)
+    total_hold_seconds = Column(Float, default=0.0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
@@ -1,11 +1,21 @@
 # app/routes/accounts.py
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
 from app.database import get_db
 from app.models.models import User, Account
+from app.models.ledger import LedgerEntry, LedgerEntryType
 from app.schemas.account import AccountCreate, AccountResponse
+from app.schemas.ledger import LedgerEntryCreate, LedgerEntryResponse, BalanceResponse
+from app.utils import exposure
+from app.utils import performance_cube  # noqa: F401  registers rebuild_performance_cube
+from app.utils import template_stats  # noqa: F401  registers rebuild_template_stats
+from app.utils.archive import purge_archived_trades
+from app.utils.ledger import post_entry, balance_at
+from app.utils.fields import parse_fields, sparse_response
+from app.utils.jobs import runner
 from app.utils.security import get_current_active_user
 
 router = APIRouter()
@@ -18,23 +28,32 @@ def create_account(
 ):
     db_account = Account(
         **account.dict(),
-        current_balance=account.initial_balance,
+        current_balance=0.0,
         user_id=current_user.id
     )
     db.add(db_account)
+    db.flush()
+    
+    # The opening balance is the account's first ledger entry
+    post_entry(db, db_account.id, LedgerEntryType.DEPOSIT, account.initial_balance, note="Initial balance")
     db.commit()
     db.refresh(db_account)
+    exposure.invalidate(current_user.id)
     return db_account
 
 @router.get("/", response_model=List[AccountResponse])
 def read_accounts(
     skip: int = 0, 
     limit: int = 100, 
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    accounts = db.query(Account).filter(Account.user_id == current_user.id).offset(skip).limit(limit).all()
-    return accounts
+    selected = parse_fields(fields, Account)
+    query = db.query(Account).filter(Account.user_id == current_user.id).offset(skip).limit(limit)
+    if selected:
+        return sparse_response(query, selected)
+    return query.all()
 
 @router.get("/{account_id}", response_model=AccountResponse)
 def read_account(
@@ -57,6 +76,70 @@ def delete_account(
     if account is None:
         raise HTTPException(status_code=404, detail="Account not found")
     
+    db.query(LedgerEntry).filter(LedgerEntry.account_id == account.id).delete(synchronize_session=False)
     db.delete(account)
     db.commit()
-    return {"message": "Account deleted successfully"}
\ No newline at end of file
+    # The id may be handed out again, so its archived trades must not linger
+    purge_archived_trades([account_id])
+    # The cascade removed its trades without subtracting them from the stats
+    runner.submit(db, current_user.id, "rebuild_template_stats")
+    runner.submit(db, current_user.id, "rebuild_performance_cube")
+    exposure.invalidate(current_user.id)
+    return {"message": "Account deleted successfully"}
+
+@router.post("/{account_id}/ledger", response_model=LedgerEntryResponse)
+def create_ledger_entry(
+    account_id: int,
+    entry_data: LedgerEntryCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    account = db.query(Account).filter(Account.id == account_id, Account.user_id == current_user.id).first()
+    if account is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    
+    # Trade P&L is only ever posted by the trade routes
+    if entry_data.entry_type == LedgerEntryType.TRADE_PNL:
+        raise HTTPException(status_code=400, detail="Trade P&L entries cannot be posted manually")
+    
+    amount = entry_data.amount
+    if entry_data.entry_type == LedgerEntryType.WITHDRAWAL:
+        amount = -abs(amount)
+    elif entry_data.entry_type == LedgerEntryType.DEPOSIT:
+        amount = abs(amount)
+    
+    entry = post_entry(db, account.id, entry_data.entry_type, amount, note=entry_data.note)
+    db.commit()
+    db.refresh(entry)
+    exposure.balance_changed(current_user.id, account.id, entry.balance_after)
+    return entry
+
+@router.get("/{account_id}/ledger", response_model=List[LedgerEntryResponse])
+def read_ledger(
+    account_id: int,
+    skip: int = 0, 
+    limit: int = 100, 
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    account = db.query(Account).filter(Account.id == account_id, Account.user_id == current_user.id).first()
+    if account is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    
+    return db.query(LedgerEntry).filter(
+        LedgerEntry.account_id == account_id
+    ).order_by(LedgerEntry.created_at.desc(), LedgerEntry.id.desc()).offset(skip).limit(limit).all()
+
+@router.get("/{account_id}/balance", response_model=BalanceResponse)
+def read_balance_at(
+    account_id: int,
+    at: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    account = db.query(Account).filter(Account.id == account_id, Account.user_id == current_user.id).first()
+    if account is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    
+    at = at or datetime.utcnow()
+    return {"account_id": account.id, "at": at, "balance": balance_at(db, account, at)}
\ No newline at end of file
@@ -0,0 +1,50 @@
+# app/routes/analytics.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.database import get_db
+from app.models.models import User
+from app.utils.performance_cube import rollup
+from app.utils.security import get_current_active_user
+
+router = APIRouter()
+
+@router.get("/heatmap")
+def read_heatmap(
+    rows: str = "hour",
+    cols: str = "weekday",
+    direction: Optional[str] = None,
+    instrument: Optional[str] = None,
+    setup: Optional[str] = None,
+    emotion: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    filters = {
+        name: value for name, value in (
+            ("direction", direction),
+            ("instrument", instrument),
+            ("setup", setup),
+            ("emotion", emotion),
+        ) if value is not None
+    }
+    
+    try:
+        cells = rollup(db, current_user.id, [rows, cols], filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"rows": rows, "cols": cols, "cells": cells}
+
+@router.get("/insights")
+def read_insights(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return {
+        "timeOfDayPerformance": rollup(db, current_user.id, ["hour"]),
+        "setupEffectiveness": rollup(db, current_user.id, ["setup"]),
+        "emotionImpact": rollup(db, current_user.id, ["emotion"]),
+        "lessonsTags": []
+    }
@@ -0,0 +1,30 @@
+# app/routes/exposure.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models.models import User
+from app.schemas.exposure import ProposedTrade
+from app.utils.exposure import get_book
+from app.utils.security import get_current_active_user
+
+router = APIRouter()
+
+@router.get("/")
+def read_exposure(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return get_book(db, current_user.id).snapshot()
+
+@router.post("/what-if")
+def what_if(
+    proposed: ProposedTrade,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    book = get_book(db, current_user.id)
+    if proposed.account_id not in book.balances:
+        raise HTTPException(status_code=404, detail="Account not found")
+    
+    return book.what_if(**proposed.dict())
@@ -0,0 +1,69 @@
+# app/routes/jobs.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session, defer
+from typing import List, Optional
+
+from app.database import get_db
+from app.models.models import User
+from app.models.job import Job, JobStatus
+from app.schemas.job import JobCreate, JobResponse, JobSummaryResponse
+from app.utils.jobs import runner
+from app.utils.security import get_current_active_user
+
+router = APIRouter()
+
+@router.post("/", response_model=JobResponse, status_code=202)
+def submit_job(
+    job_data: JobCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    try:
+        return runner.submit(
+            db,
+            current_user.id,
+            job_data.job_type,
+            job_data.params,
+            job_data.priority
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/", response_model=List[JobSummaryResponse])
+def read_jobs(
+    status: Optional[JobStatus] = None,
+    skip: int = 0, 
+    limit: int = 100, 
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    # Results (e.g. a full CSV export) are only returned by GET /{job_id}
+    query = db.query(Job).options(defer(Job.result)).filter(Job.user_id == current_user.id)
+    if status is not None:
+        query = query.filter(Job.status == status)
+    
+    return query.order_by(Job.created_at.desc()).offset(skip).limit(limit).all()
+
+@router.get("/{job_id}", response_model=JobResponse)
+def read_job(
+    job_id: int, 
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == current_user.id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+def cancel_job(
+    job_id: int, 
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == current_user.id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return runner.cancel(db, job)
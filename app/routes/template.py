@@ -1,13 +1,18 @@
 # app/routes/templates.py
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
 from app.models.models import User
-from app.models.template import Template
-from app.schemas.template import TemplateCreate, TemplateUpdate, TemplateResponse
+from app.models.template import Template, TemplateStats
+from app.schemas.template import TemplateCreate, TemplateUpdate, TemplateResponse, TemplateStatsResponse
+from app.utils import performance_cube  # noqa: F401  registers rebuild_performance_cube
+from app.utils.archive import unlink_archived_template
+from app.utils.fields import parse_fields, sparse_response
+from app.utils.jobs import runner
 from app.utils.security import get_current_active_user
+from app.utils.template_stats import stats_summary
 
 router = APIRouter()
 
@@ -30,14 +35,39 @@ def create_template(
 def read_templates(
     skip: int = 0, 
     limit: int = 100, 
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    templates = db.query(Template).filter(
+    selected = parse_fields(fields, Template)
+    query = db.query(Template).filter(
         Template.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    ).offset(skip).limit(limit)
     
-    return templates
+    if selected:
+        return sparse_response(query, selected)
+    
+    return query.all()
+
+@router.get("/stats", response_model=List[TemplateStatsResponse])
+def read_template_stats(
+    sort_by: str = "expectancy",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    if sort_by not in TemplateStatsResponse.__fields__:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by {sort_by}")
+    
+    rows = db.query(Template, TemplateStats).outerjoin(TemplateStats).filter(
+        Template.user_id == current_user.id
+    ).all()
+    
+    # Best first; templates without closed trades go last
+    summaries = [stats_summary(template, stats) for template, stats in rows]
+    ranked = [summary for summary in summaries if summary[sort_by] is not None]
+    unranked = [summary for summary in summaries if summary[sort_by] is None]
+    ranked.sort(key=lambda summary: summary[sort_by], reverse=True)
+    return ranked + unranked
 
 @router.get("/{template_id}", response_model=TemplateResponse)
 def read_template(
@@ -71,11 +101,17 @@ def update_template(
         raise HTTPException(status_code=404, detail="Template not found")
     
     # Update template fields
-    for field, value in template_data.dict(exclude_unset=True).items():
+    changes = template_data.dict(exclude_unset=True)
+    for field, value in changes.items():
         setattr(template, field, value)
     
     db.commit()
     db.refresh(template)
+    
+    # Linked trades are filed under the template's setup in the performance cube
+    if "setup_type" in changes or "template_name" in changes:
+        runner.submit(db, current_user.id, "rebuild_performance_cube")
+    
     return template
 
 @router.delete("/{template_id}")
@@ -94,4 +130,6 @@ def delete_template(
     
     db.delete(template)
     db.commit()
+    unlink_archived_template(template_id)
+    runner.submit(db, current_user.id, "rebuild_performance_cube")
     return {"message": "Template deleted successfully"}
\ No newline at end of file
@@ -1,71 +1,157 @@
 # app/routes/trades.py
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import json
 from datetime import datetime
 
-from app.database import get_db
-from app.models.models import User, Account, Trade, TradeStatus
+from app.database import get_db, get_write_db, ARCHIVE_AFTER_DAYS
+from app.models.models import User, Account, Trade, TradeDirection, TradeStatus
+from app.models.ledger import LedgerEntryType
+from app.models.template import Template
 from app.schemas.trade import TradeCreate, TradeUpdate, TradeResponse
+from app.utils import exposure, performance_cube, template_stats
+from app.utils.archive import archive_closed_trades, get_archived_trade, query_trades
+from app.utils.export import trade_csv_rows
+from app.utils.fields import parse_fields, sparse_response
+from app.utils.group_commit import run_write
+from app.utils.ledger import post_entry
 from app.utils.security import get_current_active_user
 
 router = APIRouter()
 
+def get_user_template(db: Session, template_id: int, current_user: User) -> Template:
+    template = db.query(Template).filter(
+        Template.id == template_id,
+        Template.user_id == current_user.id
+    ).first()
+    if template is None:
+        raise HTTPException(status_code=404, detail="Template not found")
+    return template
+
+def apply_trade_stats(db: Session, user_id: int, trade: Trade, sign: int = 1):
+    # Keep the materialized template stats and performance cube in step
+    template_stats.apply_trade(db, trade, sign)
+    performance_cube.apply_trade(db, user_id, trade, sign)
+
 @router.post("/", response_model=TradeResponse)
 def create_trade(
     trade_data: TradeCreate,
     account_id: int,
-    db: Session = Depends(get_db),
+    template_id: Optional[int] = None,
+    db: Session = Depends(get_write_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    # Check if account exists and belongs to user
-    account = db.query(Account).filter(Account.id == account_id, Account.user_id == current_user.id).first()
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
-    
     # Process pre-analysis if provided
     pre_analysis_json = None
     if trade_data.pre_analysis:
         pre_analysis_json = json.dumps(trade_data.pre_analysis.dict())
     
-    # Create trade
     trade_dict = trade_data.dict(exclude={"pre_analysis"})
-    db_trade = Trade(
-        **trade_dict,
-        account_id=account_id,
-        pre_analysis=pre_analysis_json
-    )
     
-    db.add(db_trade)
-    db.commit()
-    db.refresh(db_trade)
+    def write(db: Session):
+        # Check if account exists and belongs to user
+        account = db.query(Account).filter(Account.id == account_id, Account.user_id == current_user.id).first()
+        if not account:
+            raise HTTPException(status_code=404, detail="Account not found")
+        
+        if template_id is not None:
+            get_user_template(db, template_id, current_user)
+        
+        # Create trade; timestamps are set here rather than by the server
+        # default so the row can be returned without a refresh
+        now = datetime.utcnow()
+        db_trade = Trade(
+            **{**trade_dict, "entry_date": trade_dict.get("entry_date") or now},
+            account_id=account_id,
+            template_id=template_id,
+            pre_analysis=pre_analysis_json,
+            created_at=now
+        )
+        db.add(db_trade)
+        db.flush()
+        return db_trade
+    
+    db_trade = run_write(db, write)
+    exposure.trade_opened(current_user.id, db_trade)
     return db_trade
 
-    trades = db.query(Trade).join(Account).filter(
-        Account.user_id == current_user.id
-    ).order_by(Trade.entry_date.desc()).offset(skip).limit(limit).all()
+@router.get("/", response_model=List[TradeResponse])
+def read_user_trades(
+    skip: int = 0, 
+    limit: int = 100, 
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    selected = parse_fields(fields, Trade)
+    user_accounts = select(Account.id).where(Account.user_id == current_user.id)
+    query = query_trades(
+        db, user_accounts, start_date, end_date, selected
+    ).offset(skip).limit(limit)
     
-    return trades
+    if selected:
+        return sparse_response(query, selected)
+    
+    return query.all()
+
+@router.get("/export")
+def export_trades(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    user_accounts = select(Account.id).where(Account.user_id == current_user.id)
+    trades = query_trades(db, user_accounts, start_date, end_date)
+    
+    return StreamingResponse(
+        trade_csv_rows(trades),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=trades.csv"}
+    )
+
+@router.post("/archive")
+def archive_trades(
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    # Move the user's old closed trades out of the hot table
+    user_accounts = select(Account.id).where(Account.user_id == current_user.id)
+    archived = archive_closed_trades(user_accounts, older_than_days)
+    return {"message": f"Archived {archived} trades", "archived": archived}
 
 @router.get("/account/{account_id}", response_model=List[TradeResponse])
 def read_account_trades(
     account_id: int,
     skip: int = 0, 
     limit: int = 100, 
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
+    selected = parse_fields(fields, Trade)
+    
     # Check if account exists and belongs to user
     account = db.query(Account).filter(Account.id == account_id, Account.user_id == current_user.id).first()
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     
-    trades = db.query(Trade).filter(
-        Trade.account_id == account_id
-    ).order_by(Trade.entry_date.desc()).offset(skip).limit(limit).all()
+    query = query_trades(
+        db, [account_id], start_date, end_date, selected
+    ).offset(skip).limit(limit)
+    
+    if selected:
+        return sparse_response(query, selected)
     
-    return trades
+    return query.all()
 
 @router.get("/{trade_id}", response_model=TradeResponse)
 def read_trade(
@@ -78,6 +164,11 @@ def read_trade(
         Account.user_id == current_user.id
     ).first()
     
+    # Listings include archived trades, so they must open by id too
+    if trade is None:
+        user_accounts = select(Account.id).where(Account.user_id == current_user.id)
+        trade = get_archived_trade(db, trade_id, user_accounts)
+    
     if trade is None:
         raise HTTPException(status_code=404, detail="Trade not found")
     
@@ -87,51 +178,82 @@ def read_trade(
 def close_trade(
     trade_id: int,
     trade_update: TradeUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_write_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    # Get trade and verify ownership
-    trade = db.query(Trade).join(Account).filter(
-        Trade.id == trade_id,
-        Account.user_id == current_user.id
-    ).first()
-    
-    if trade is None:
-        raise HTTPException(status_code=404, detail="Trade not found")
-    
-    # Process post-analysis if provided
-    if trade_update.post_analysis:
-        trade.post_analysis = json.dumps(trade_update.post_analysis.dict())
-    
-    # Update trade fields
-    if trade_update.exit_price is not None:
-        trade.exit_price = trade_update.exit_price
-    
-    if trade_update.exit_date is not None:
-        trade.exit_date = trade_update.exit_date
-    else:
-        trade.exit_date = datetime.utcnow()
-    
-    # Calculate result if not provided
-    if trade_update.result is not None:
-        trade.result = trade_update.result
-    elif trade.exit_price and trade.entry_price:
-        # Calculate profit/loss
-        if trade.direction == TradeDirection.LONG:
-            trade.result = (trade.exit_price - trade.entry_price) * trade.position_size
+    def write(db: Session):
+        # Get trade and verify ownership
+        trade = db.query(Trade).join(Account).filter(
+            Trade.id == trade_id,
+            Account.user_id == current_user.id
+        ).first()
+        
+        if trade is None:
+            raise HTTPException(status_code=404, detail="Trade not found")
+        
+        # Claim the open -> closed transition in SQL. The UPDATE takes the write
+        # lock, so of two concurrent closes only one sees the trade open, and
+        # the reload below reads whatever an earlier close committed.
+        was_open = bool(db.query(Trade).filter(
+            Trade.id == trade.id,
+            Trade.status == TradeStatus.OPEN
+        ).update({Trade.status: TradeStatus.CLOSED}, synchronize_session=False))
+        trade = db.query(Trade).populate_existing().filter(Trade.id == trade_id).first()
+        
+        # Deleted by a concurrent request since the ownership check
+        if trade is None:
+            raise HTTPException(status_code=404, detail="Trade not found")
+        
+        previous_result = None if was_open else trade.result
+        
+        # Take out the old figures if the trade is being re-closed
+        if not was_open:
+            apply_trade_stats(db, current_user.id, trade, -1)
+        
+        # Process post-analysis if provided
+        if trade_update.post_analysis:
+            trade.post_analysis = json.dumps(trade_update.post_analysis.dict())
+        
+        # Update trade fields
+        if trade_update.exit_price is not None:
+            trade.exit_price = trade_update.exit_price
+        
+        if trade_update.exit_date is not None:
+            trade.exit_date = trade_update.exit_date
         else:
-            trade.result = (trade.entry_price - trade.exit_price) * trade.position_size
+            trade.exit_date = datetime.utcnow()
+        
+        # Calculate result if not provided
+        if trade_update.result is not None:
+            trade.result = trade_update.result
+        elif trade.exit_price and trade.entry_price:
+            # Calculate profit/loss
+            if trade.direction == TradeDirection.LONG:
+                trade.result = (trade.exit_price - trade.entry_price) * trade.position_size
+            else:
+                trade.result = (trade.entry_price - trade.exit_price) * trade.position_size
+        
+        # Update status
+        trade.status = TradeStatus.CLOSED
+        trade.updated_at = datetime.utcnow()
+        apply_trade_stats(db, current_user.id, trade)
+        
+        # Update account balance through the ledger, reversing any earlier close
+        if previous_result:
+            post_entry(db, trade.account_id, LedgerEntryType.CORRECTION, -previous_result,
+                       trade_id=trade.id, note="Trade re-closed")
+        if trade.result:
+            post_entry(db, trade.account_id, LedgerEntryType.TRADE_PNL, trade.result, trade_id=trade.id)
+        
+        balance = db.query(Account.current_balance).filter(Account.id == trade.account_id).scalar()
+        return trade, was_open, balance
     
-    # Update status
-    trade.status = TradeStatus.CLOSED
-    
-    # Update account balance
-    if trade.result:
-        account = db.query(Account).filter(Account.id == trade.account_id).first()
-        account.current_balance += trade.result
-    
-    db.commit()
-    db.refresh(trade)
+    trade, was_open, balance = run_write(db, write)
+    if was_open:
+        exposure.trade_closed(current_user.id, trade, balance)
+    else:
+        # A re-close still moves the balance (correction plus new P&L)
+        exposure.balance_changed(current_user.id, trade.account_id, balance)
     return trade
 
 @router.patch("/{trade_id}/analysis", response_model=TradeResponse)
@@ -139,6 +261,38 @@ def update_trade_analysis(
     trade_id: int,
     pre_analysis: Optional[dict] = None,
     post_analysis: Optional[dict] = None,
+    db: Session = Depends(get_write_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    def write(db: Session):
+        # Get trade and verify ownership
+        trade = db.query(Trade).join(Account).filter(
+            Trade.id == trade_id,
+            Account.user_id == current_user.id
+        ).first()
+        
+        if trade is None:
+            raise HTTPException(status_code=404, detail="Trade not found")
+        
+        # Update pre-analysis if provided
+        if pre_analysis:
+            trade.pre_analysis = json.dumps(pre_analysis)
+        
+        # Update post-analysis if provided, moving the trade to its new emotion cell
+        if post_analysis:
+            performance_cube.apply_trade(db, current_user.id, trade, -1)
+            trade.post_analysis = json.dumps(post_analysis)
+            performance_cube.apply_trade(db, current_user.id, trade)
+        
+        trade.updated_at = datetime.utcnow()
+        return trade
+    
+    return run_write(db, write)
+
+@router.patch("/{trade_id}/template", response_model=TradeResponse)
+def update_trade_template(
+    trade_id: int,
+    template_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -151,13 +305,13 @@ def update_trade_analysis(
     if trade is None:
         raise HTTPException(status_code=404, detail="Trade not found")
     
-    # Update pre-analysis if provided
-    if pre_analysis:
-        trade.pre_analysis = json.dumps(pre_analysis)
+    # Link to a template, or unlink when template_id is omitted
+    if template_id is not None:
+        get_user_template(db, template_id, current_user)
     
-    # Update post-analysis if provided
-    if post_analysis:
-        trade.post_analysis = json.dumps(post_analysis)
+    apply_trade_stats(db, current_user.id, trade, -1)
+    trade.template_id = template_id
+    apply_trade_stats(db, current_user.id, trade)
     
     db.commit()
     db.refresh(trade)
@@ -178,11 +332,30 @@ def delete_trade(
     if trade is None:
         raise HTTPException(status_code=404, detail="Trade not found")
     
+    # SQLite has no SELECT ... FOR UPDATE; touching the row takes the write
+    # lock, so the status and result reloaded below are what a concurrent
+    # close actually committed
+    locked = db.query(Trade).filter(Trade.id == trade.id).update(
+        {Trade.updated_at: Trade.updated_at}, synchronize_session=False
+    )
+    trade = db.query(Trade).populate_existing().filter(Trade.id == trade_id).first()
+    if not locked or trade is None:
+        raise HTTPException(status_code=404, detail="Trade not found")
+    
     # If trade is closed and has affected account balance, revert it
     if trade.status == TradeStatus.CLOSED and trade.result:
-        account = db.query(Account).filter(Account.id == trade.account_id).first()
-        account.current_balance -= trade.result
+        post_entry(db, trade.account_id, LedgerEntryType.CORRECTION, -trade.result,
+                   trade_id=trade.id, note="Trade deleted")
     
+    was_open = trade.status == TradeStatus.OPEN
+    account_id = trade.account_id
+    apply_trade_stats(db, current_user.id, trade, -1)
     db.delete(trade)
     db.commit()
+    
+    balance = db.query(Account.current_balance).filter(Account.id == account_id).scalar()
+    if was_open:
+        exposure.trade_closed(current_user.id, trade, balance)
+    else:
+        exposure.balance_changed(current_user.id, account_id, balance)
     return {"message": "Trade deleted successfully"}
\ No newline at end of file
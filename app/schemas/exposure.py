@@ -0,0 +1,13 @@
+# app/schemas/exposure.py
+from pydantic import BaseModel
+from typing import Optional
+
+from app.models.models import TradeDirection
+
+class ProposedTrade(BaseModel):
+    account_id: int
+    instrument: str = "XAUUSD"
+    direction: TradeDirection
+    entry_price: float
+    position_size: float
+    stop_loss: Optional[float] = None
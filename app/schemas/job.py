@@ -0,0 +1,45 @@
+# app/schemas/job.py
+from pydantic import BaseModel, validator
+from datetime import datetime
+from typing import Any, Optional
+import json
+
+from app.models.job import JobStatus
+
+class JobCreate(BaseModel):
+    job_type: str
+    params: Optional[dict] = None
+    priority: int = 0
+
+class JobSummaryResponse(BaseModel):
+    """A job without its result, for listings."""
+    id: int
+    user_id: int
+    job_type: str
+    status: JobStatus
+    priority: int
+    progress: float
+    params: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+    @validator("params", pre=True)
+    def parse_json(cls, value):
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+
+    class Config:
+        orm_mode = True
+
+class JobResponse(JobSummaryResponse):
+    result: Optional[Any] = None
+
+    @validator("result", pre=True)
+    def parse_result(cls, value):
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
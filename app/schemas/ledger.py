@@ -0,0 +1,29 @@
+# app/schemas/ledger.py
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+from app.models.ledger import LedgerEntryType
+
+class LedgerEntryCreate(BaseModel):
+    entry_type: LedgerEntryType
+    amount: float
+    note: Optional[str] = None
+
+class LedgerEntryResponse(BaseModel):
+    id: int
+    account_id: int
+    entry_type: LedgerEntryType
+    amount: float
+    balance_after: float
+    trade_id: Optional[int] = None
+    note: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class BalanceResponse(BaseModel):
+    account_id: int
+    at: datetime
+    balance: float
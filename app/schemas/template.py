@@ -27,4 +27,14 @@ class TemplateResponse(TemplateBase):
     updated_at: Optional[datetime] = None
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class TemplateStatsResponse(BaseModel):
+    template_id: int
+    template_name: str
+    setup_type: Optional[str] = None
+    trade_count: int
+    win_rate: Optional[float] = None
+    expectancy: Optional[float] = None
+    avg_r_multiple: Optional[float] = None
+    avg_hold_seconds: Optional[float] = None
\ No newline at end of file
@@ -0,0 +1,155 @@
+# app/utils/archive.py
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
+
+from app.database import engine, ARCHIVE_DATABASE_PATH, ARCHIVE_AFTER_DAYS
+from app.models.archive import archived_trades
+from app.models.models import Account, Trade, TradeStatus
+from app.utils.jobs import register_job
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+@contextmanager
+def writable_archive():
+    """Connection with the archive file attached writable as "archive_rw".
+
+    Statements using archived_trades are translated onto it. This is a
+    separate connection because ATTACH is not allowed inside the transaction
+    a request session may already have open.
+    """
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ATTACH DATABASE ? AS archive_rw", (ARCHIVE_DATABASE_PATH,))
+        try:
+            yield conn.execution_options(schema_translate_map={"archive": "archive_rw"})
+        finally:
+            conn.exec_driver_sql("DETACH DATABASE archive_rw")
+
+def archive_closed_trades(account_ids, older_than_days: int = ARCHIVE_AFTER_DAYS) -> int:
+    """Move closed trades that exited before the cutoff into the archive file."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    trades = Trade.__table__
+    criteria = [
+        trades.c.account_id.in_(account_ids),
+        trades.c.status == TradeStatus.CLOSED,
+        trades.c.exit_date < cutoff,
+    ]
+
+    # The main database is in WAL mode, where SQLite does not commit attached
+    # files atomically, so the move is two single-file transactions: copy
+    # (replacing any copy a crashed run left behind), then delete only hot
+    # rows whose archived copy is identical. A crash in between leaves
+    # duplicates that query_trades hides and the next run removes.
+    archived = archived_trades.alias("archived")
+    copied = select(archived.c.id).where(
+        *[archived.c[column.name].is_(column) for column in trades.c]
+    ).exists()
+
+    with writable_archive() as rw:
+        with rw.begin():
+            rw.execute(
+                archived_trades.insert().prefix_with("OR REPLACE").from_select(
+                    [c.name for c in trades.c], select(trades).where(*criteria)
+                )
+            )
+        with rw.begin():
+            return rw.execute(trades.delete().where(*criteria, copied)).rowcount
+
+def purge_archived_trades(account_ids) -> int:
+    """Delete archived trades of accounts that are being removed."""
+    with writable_archive() as rw, rw.begin():
+        return rw.execute(
+            archived_trades.delete().where(archived_trades.c.account_id.in_(account_ids))
+        ).rowcount
+
+def unlink_archived_template(template_id: int) -> int:
+    """Clear a deleted template from archived trades, as the ORM does for hot ones.
+
+    Template ids can be reused, so a lingering link would credit old trades
+    to a new template on the next stats rebuild.
+    """
+    with writable_archive() as rw, rw.begin():
+        return rw.execute(
+            archived_trades.update().where(
+                archived_trades.c.template_id == template_id
+            ).values(template_id=None)
+        ).rowcount
+
+@register_job("archive_trades")
+def archive_trades_job(db, params, context):
+    user_accounts = select(Account.id).where(Account.user_id == context.user_id)
+    older_than_days = params.get("older_than_days", ARCHIVE_AFTER_DAYS)
+    return {"archived": archive_closed_trades(user_accounts, older_than_days)}
+
+def archive_watermark(db: Session) -> Optional[datetime]:
+    # Latest entry_date in the archive; served from the entry_date index
+    return db.query(func.max(archived_trades.c.entry_date)).scalar()
+
+def needs_archive(db: Session, start_date: Optional[datetime] = None) -> bool:
+    watermark = archive_watermark(db)
+    if watermark is None:
+        return False
+    start_date = to_naive_utc(start_date)
+    return start_date is None or start_date <= watermark
+
+def get_archived_trade(db: Session, trade_id: int, account_ids) -> Optional[Trade]:
+    """Load one archived trade of the given accounts as a Trade, or None."""
+    stmt = select(archived_trades).where(
+        archived_trades.c.id == trade_id,
+        archived_trades.c.account_id.in_(account_ids)
+    )
+    entity = aliased(Trade, stmt.subquery(), adapt_on_names=True)
+    return db.query(entity).first()
+
+def query_trades(
+    db: Session,
+    account_ids,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    fields: Optional[List[str]] = None
+):
+    """Query trades for the given accounts and entry date range, newest first.
+
+    Only the hot table is read unless the range reaches back past the archive
+    watermark, in which case Trade is aliased over a UNION ALL of the hot and
+    archived rows so callers still get Trade instances. `fields` narrows the
+    UNION to those columns for sparse responses; the hot-only query is
+    narrowed by the caller's load_only instead.
+    """
+    start_date = to_naive_utc(start_date)
+    end_date = to_naive_utc(end_date)
+
+    names = None
+    if fields:
+        # id and entry_date are always needed for identity and ordering
+        names = list(dict.fromkeys(["id", "entry_date", *fields]))
+
+    def _select(table, *criteria):
+        columns = [table.c[name] for name in names] if names else [table]
+        stmt = select(*columns).where(table.c.account_id.in_(account_ids), *criteria)
+        if start_date is not None:
+            stmt = stmt.where(table.c.entry_date >= start_date)
+        if end_date is not None:
+            stmt = stmt.where(table.c.entry_date <= end_date)
+        return stmt
+
+    if needs_archive(db, start_date):
+        # Skip archived copies whose hot row an interrupted move left behind
+        hot = Trade.__table__.alias("hot")
+        still_hot = select(hot.c.id).where(hot.c.id == archived_trades.c.id).exists()
+        stmt = _select(Trade.__table__).union_all(_select(archived_trades, ~still_hot))
+        entity = aliased(Trade, stmt.subquery(), adapt_on_names=True)
+        return db.query(entity).order_by(entity.entry_date.desc())
+
+    query = db.query(Trade).filter(Trade.account_id.in_(account_ids))
+    if start_date is not None:
+        query = query.filter(Trade.entry_date >= start_date)
+    if end_date is not None:
+        query = query.filter(Trade.entry_date <= end_date)
+    return query.order_by(Trade.entry_date.desc())
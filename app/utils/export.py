@@ -0,0 +1,47 @@
+# app/utils/export.py
+import csv
+import io
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.models.models import Account, Trade
+from app.utils.archive import query_trades
+from app.utils.jobs import PROGRESS_INTERVAL, register_job
+
+TRADE_COLUMNS = [column.name for column in Trade.__table__.columns]
+
+def trade_csv_rows(trades):
+    """Yield a trade query as CSV text, one chunk per row after the header."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(TRADE_COLUMNS)
+    yield output.getvalue()
+    output.seek(0)
+    output.truncate(0)
+    for trade in trades.yield_per(500):
+        writer.writerow([getattr(trade, column) for column in TRADE_COLUMNS])
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+
+def _parse_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+@register_job("export_trades")
+def export_trades_job(db, params, context):
+    user_accounts = select(Account.id).where(Account.user_id == context.user_id)
+    trades = query_trades(
+        db,
+        user_accounts,
+        _parse_date(params.get("start_date")),
+        _parse_date(params.get("end_date"))
+    )
+    total = trades.count()
+    chunks = []
+    # The header is chunk 0, so the index is the number of rows written
+    for done, chunk in enumerate(trade_csv_rows(trades)):
+        chunks.append(chunk)
+        if done and done % PROGRESS_INTERVAL == 0:
+            context.report_progress(done / total)
+    return {"filename": "trades.csv", "csv": "".join(chunks)}
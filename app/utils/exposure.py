@@ -0,0 +1,213 @@
+# app/utils/exposure.py
+"""
+Running exposure totals across a user's open trades.
+
+Each user's book is built with one query over their open trades and then
+kept current by the trade routes as trades are opened, closed and deleted,
+so "what if" checks for a proposed trade are constant time. Books live in
+process memory and are rebuilt from the database on first use.
+
+Units follow close_trade's P&L formula: position_size is in units of the
+instrument, so notional is entry_price * position_size.
+"""
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.models import Account, Trade, TradeDirection, TradeStatus
+
+DEFAULT_LEVERAGE = 100
+
+class Totals:
+    __slots__ = ("net", "gross", "risk_to_stop", "unprotected", "margin", "count")
+
+    def __init__(self, net=0.0, gross=0.0, risk_to_stop=0.0, unprotected=0, margin=0.0, count=0):
+        self.net = net
+        self.gross = gross
+        self.risk_to_stop = risk_to_stop
+        self.unprotected = unprotected
+        self.margin = margin
+        self.count = count
+
+    def add(self, other: "Totals", sign: int = 1):
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + sign * getattr(other, name))
+
+    def plus(self, other: "Totals") -> "Totals":
+        totals = Totals()
+        totals.add(self)
+        totals.add(other)
+        return totals
+
+    def to_dict(self, balance: Optional[float] = None) -> dict:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        if balance:
+            data["margin_usage"] = self.margin / balance
+            data["risk_to_stop_pct"] = self.risk_to_stop / balance
+        return data
+
+def trade_totals(direction, entry_price, position_size, stop_loss, leverage=DEFAULT_LEVERAGE) -> Totals:
+    """Contribution of a single open position."""
+    signed = position_size if direction == TradeDirection.LONG else -position_size
+    return Totals(
+        net=signed,
+        gross=position_size,
+        risk_to_stop=abs(entry_price - stop_loss) * position_size if stop_loss is not None else 0.0,
+        unprotected=0 if stop_loss is not None else 1,
+        margin=entry_price * position_size / leverage,
+        count=1
+    )
+
+class ExposureBook:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.balances: Dict[int, float] = {}
+        self.positions: Dict[Tuple[int, str], Totals] = {}
+        self.accounts: Dict[int, Totals] = {}
+        self.instruments: Dict[str, Totals] = {}
+        self.total = Totals()
+        # Ids counted in the totals, so a hook for a trade the build already
+        # saw (or missed) is applied exactly once
+        self.open_trades: Set[int] = set()
+
+    def _apply(self, account_id: int, instrument: str, totals: Totals, sign: int):
+        self.positions.setdefault((account_id, instrument), Totals()).add(totals, sign)
+        self.accounts.setdefault(account_id, Totals()).add(totals, sign)
+        self.instruments.setdefault(instrument, Totals()).add(totals, sign)
+        self.total.add(totals, sign)
+
+    def open_trade(self, trade: Trade):
+        totals = trade_totals(trade.direction, trade.entry_price, trade.position_size, trade.stop_loss)
+        with self.lock:
+            if trade.id not in self.open_trades:
+                self.open_trades.add(trade.id)
+                self._apply(trade.account_id, trade.instrument, totals, 1)
+
+    def close_trade(self, trade: Trade):
+        totals = trade_totals(trade.direction, trade.entry_price, trade.position_size, trade.stop_loss)
+        with self.lock:
+            if trade.id in self.open_trades:
+                self.open_trades.remove(trade.id)
+                self._apply(trade.account_id, trade.instrument, totals, -1)
+
+    def set_balance(self, account_id: int, balance: float):
+        with self.lock:
+            self.balances[account_id] = balance
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            total_balance = sum(self.balances.values())
+            return {
+                "total": self.total.to_dict(total_balance),
+                "accounts": [
+                    {
+                        "account_id": account_id,
+                        "balance": balance,
+                        **self.accounts.get(account_id, Totals()).to_dict(balance),
+                        "instruments": [
+                            {"instrument": instrument, **totals.to_dict(balance)}
+                            for (position_account, instrument), totals in self.positions.items()
+                            if position_account == account_id and totals.count
+                        ]
+                    }
+                    for account_id, balance in self.balances.items()
+                ],
+                "instruments": [
+                    {"instrument": instrument, **totals.to_dict()}
+                    for instrument, totals in self.instruments.items()
+                    if totals.count
+                ]
+            }
+
+    def what_if(self, account_id: int, instrument: str, direction, entry_price: float,
+                position_size: float, stop_loss: Optional[float] = None) -> dict:
+        proposed = trade_totals(direction, entry_price, position_size, stop_loss)
+        with self.lock:
+            balance = self.balances[account_id]
+            position = self.positions.get((account_id, instrument), Totals())
+            account = self.accounts.get(account_id, Totals())
+            return {
+                "trade": proposed.to_dict(balance),
+                "position": position.plus(proposed).to_dict(balance),
+                "account": account.plus(proposed).to_dict(balance),
+                "total": self.total.plus(proposed).to_dict(sum(self.balances.values()))
+            }
+
+def build_book(db: Session, user_id: int) -> ExposureBook:
+    """Load all open positions for a user in a single query."""
+    book = ExposureBook()
+
+    for account_id, balance in db.query(Account.id, Account.current_balance).filter(
+        Account.user_id == user_id
+    ):
+        book.balances[account_id] = balance or 0.0
+
+    rows = db.query(
+        Trade.id,
+        Trade.account_id,
+        Trade.instrument,
+        Trade.direction,
+        Trade.entry_price,
+        Trade.position_size,
+        Trade.stop_loss
+    ).join(Account).filter(
+        Account.user_id == user_id,
+        Trade.status == TradeStatus.OPEN
+    )
+
+    for trade_id, account_id, instrument, *position in rows:
+        book.open_trades.add(trade_id)
+        book._apply(account_id, instrument, trade_totals(*position), 1)
+
+    return book
+
+_books: Dict[int, ExposureBook] = {}
+# Bumped by every hook; a build that raced with one is thrown away and redone
+_generations: Dict[int, int] = {}
+_books_lock = threading.Lock()
+
+def get_book(db: Session, user_id: int) -> ExposureBook:
+    while True:
+        with _books_lock:
+            book = _books.get(user_id)
+            generation = _generations.get(user_id, 0)
+        if book is not None:
+            return book
+
+        book = build_book(db, user_id)
+        with _books_lock:
+            if _generations.get(user_id, 0) == generation:
+                return _books.setdefault(user_id, book)
+        # A trade or balance changed while building; it may have committed
+        # after our query but before its hook found a book to update
+        db.rollback()
+
+def _loaded_book(user_id: int) -> Optional[ExposureBook]:
+    with _books_lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        return _books.get(user_id)
+
+def invalidate(user_id: int):
+    with _books_lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        _books.pop(user_id, None)
+
+# Hooks for the trade routes, called after commit. They only touch books that
+# are already loaded; a build running concurrently is redone instead.
+
+def trade_opened(user_id: int, trade: Trade):
+    book = _loaded_book(user_id)
+    if book is not None:
+        book.open_trade(trade)
+
+def trade_closed(user_id: int, trade: Trade, balance: float):
+    book = _loaded_book(user_id)
+    if book is not None:
+        book.close_trade(trade)
+        book.set_balance(trade.account_id, balance)
+
+def balance_changed(user_id: int, account_id: int, balance: float):
+    book = _loaded_book(user_id)
+    if book is not None:
+        book.set_balance(account_id, balance)
@@ -0,0 +1,33 @@
+# app/utils/fields.py
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import load_only
+from typing import List, Optional
+
+def parse_fields(fields: Optional[str], model) -> Optional[List[str]]:
+    """Parse a comma separated `fields=` parameter against a model's columns.
+
+    Returns None when no projection was requested so callers can fall back
+    to the full response model.
+    """
+    if not fields:
+        return None
+
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    columns = model.__table__.columns.keys()
+    unknown = [name for name in names if name not in columns]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+
+    return names
+
+def sparse_response(query, fields: List[str]) -> JSONResponse:
+    # Only the requested columns are selected and serialized
+    rows = query.options(load_only(*fields)).all()
+    return JSONResponse(
+        jsonable_encoder([{name: getattr(row, name) for name in fields} for row in rows])
+    )
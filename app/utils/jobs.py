@@ -0,0 +1,276 @@
+# app/utils/jobs.py
+"""
+In-process background jobs.
+
+Job rows are persisted in the jobs table and executed by a bounded pool of
+worker threads, highest priority first. Job types registered with
+executor="process" are handed to a process pool from the worker thread so
+CPU-bound work does not hold the GIL. Long jobs call report_progress (or
+check_cancelled, while they hold the write lock) every PROGRESS_INTERVAL
+items, which is where a cancel request takes effect.
+"""
+import itertools
+import json
+import logging
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.job import Job, JobStatus
+
+JOB_WORKERS = 4
+JOB_PROCESSES = 2
+JOB_RESULT_TTL = timedelta(hours=24)
+CLEANUP_INTERVAL = 60
+PROGRESS_INTERVAL = 500
+# Times a job is re-queued after the process pool broke under it
+PROCESS_RETRIES = 2
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+class JobCancelled(Exception):
+    pass
+
+class JobType:
+    def __init__(self, func: Callable, executor: str = "thread"):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor: {executor}")
+        self.func = func
+        self.executor = executor
+
+JOB_TYPES: Dict[str, JobType] = {}
+
+def register_job(name: str, executor: str = "thread"):
+    """Register a job type.
+
+    Thread jobs are called as func(db, params, context) and process jobs as
+    func(params, context), opening their own session. Both return a JSON
+    serializable result.
+    """
+    def decorator(func):
+        JOB_TYPES[name] = JobType(func, executor)
+        return func
+    return decorator
+
+class JobContext:
+    def __init__(self, job_id: int, user_id: int):
+        self.job_id = job_id
+        self.user_id = user_id
+
+    def report_progress(self, progress: float):
+        # Uses its own session so progress is visible to pollers immediately
+        db = SessionLocal()
+        try:
+            job = db.query(Job).filter(Job.id == self.job_id).first()
+            job.progress = max(0.0, min(progress, 1.0))
+            db.commit()
+            if job.cancel_requested:
+                raise JobCancelled()
+        finally:
+            db.close()
+
+    def check_cancelled(self):
+        # Read-only, for jobs holding the write lock that can't record progress
+        db = SessionLocal()
+        try:
+            if db.query(Job.cancel_requested).filter(Job.id == self.job_id).scalar():
+                raise JobCancelled()
+        finally:
+            db.close()
+
+class JobRunner:
+    def __init__(self, max_workers: int = JOB_WORKERS, max_processes: int = JOB_PROCESSES):
+        self.max_workers = max_workers
+        self.max_processes = max_processes
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._threads = []
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._processes_lock = threading.Lock()
+        self._retries: Dict[int, int] = {}
+
+    def start(self):
+        if self._threads:
+            return
+
+        # Re-queue anything a previous process left unfinished
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(Job.status == JobStatus.RUNNING).update(
+                {Job.status: JobStatus.QUEUED, Job.started_at: None, Job.progress: 0.0},
+                synchronize_session=False
+            )
+            db.commit()
+            pending = db.query(Job.id, Job.priority).filter(
+                Job.status == JobStatus.QUEUED
+            ).order_by(Job.created_at).all()
+        finally:
+            db.close()
+
+        for job_id, priority in pending:
+            self._enqueue(job_id, priority)
+
+        self._processes = self._new_process_pool()
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        for _ in self._threads:
+            # Sentinels sort before every real job
+            self._queue.put((float("-inf"), next(self._counter), None))
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._processes is not None:
+            self._processes.shutdown(cancel_futures=True)
+            self._processes = None
+
+    def _new_process_pool(self) -> ProcessPoolExecutor:
+        # Spawned rather than forked: the workers are started from a threaded process
+        return ProcessPoolExecutor(
+            max_workers=self.max_processes,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _replace_process_pool(self, broken: ProcessPoolExecutor):
+        # A pool stays broken once any child dies; only the first of the
+        # workers that notice swaps in a new one
+        with self._processes_lock:
+            if self._processes is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._processes = self._new_process_pool()
+
+    def submit(self, db: Session, user_id: int, job_type: str, params: Optional[dict] = None, priority: int = 0) -> Job:
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job = Job(
+            user_id=user_id,
+            job_type=job_type,
+            priority=priority,
+            params=json.dumps(params or {}),
+            status=JobStatus.QUEUED
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._enqueue(job.id, priority)
+        return job
+
+    def cancel(self, db: Session, job: Job) -> Job:
+        if job.status == JobStatus.QUEUED:
+            # The worker skips it when it is dequeued
+            self._finish(job, JobStatus.CANCELLED)
+        elif job.status == JobStatus.RUNNING:
+            job.cancel_requested = True
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def _enqueue(self, job_id: int, priority: int):
+        self._queue.put((-priority, next(self._counter), job_id))
+
+    def _worker(self):
+        while True:
+            try:
+                _, _, job_id = self._queue.get(timeout=CLEANUP_INTERVAL)
+            except queue.Empty:
+                try:
+                    self.cleanup()
+                except Exception:
+                    logger.exception("Job cleanup failed")
+                continue
+            if job_id is None:
+                return
+            try:
+                self._run(job_id)
+            except Exception:
+                # e.g. the database was locked while claiming or finishing;
+                # the job stays queued or running and is retried on restart
+                logger.exception("Job %s could not be run", job_id)
+
+    def _run(self, job_id: int):
+        db = SessionLocal()
+        try:
+            # Claim the job; fails if it was cancelled while queued
+            claimed = db.query(Job).filter(
+                Job.id == job_id, Job.status == JobStatus.QUEUED
+            ).update(
+                {Job.status: JobStatus.RUNNING, Job.started_at: datetime.utcnow()},
+                synchronize_session=False
+            )
+            db.commit()
+            if not claimed:
+                return
+
+            job = db.query(Job).filter(Job.id == job_id).first()
+            params = json.loads(job.params or "{}")
+            context = JobContext(job.id, job.user_id)
+            processes = self._processes
+            try:
+                job_type = JOB_TYPES[job.job_type]
+                if job_type.executor == "process":
+                    result = processes.submit(job_type.func, params, context).result()
+                else:
+                    result = job_type.func(db, params, context)
+            except BrokenProcessPool as e:
+                # A child process died, e.g. killed for memory. Every job in
+                # the pool fails with this, not just the one that crashed it.
+                db.rollback()
+                self._replace_process_pool(processes)
+                retries = self._retries.get(job.id, 0)
+                if retries < PROCESS_RETRIES:
+                    self._retries[job.id] = retries + 1
+                    job.status = JobStatus.QUEUED
+                    job.started_at = None
+                    job.progress = 0.0
+                    db.commit()
+                    self._enqueue(job.id, job.priority)
+                    return
+                job.error = str(e) or "Worker process died"
+                self._finish(job, JobStatus.FAILED)
+            except JobCancelled:
+                db.rollback()
+                self._finish(job, JobStatus.CANCELLED)
+            except Exception as e:
+                db.rollback()
+                job.error = str(e)
+                self._finish(job, JobStatus.FAILED)
+            else:
+                job.result = json.dumps(result)
+                job.progress = 1.0
+                self._finish(job, JobStatus.SUCCEEDED)
+            db.commit()
+        finally:
+            db.close()
+
+    def _finish(self, job: Job, status: JobStatus):
+        self._retries.pop(job.id, None)
+        job.status = status
+        job.finished_at = datetime.utcnow()
+        job.expires_at = job.finished_at + JOB_RESULT_TTL
+
+    def cleanup(self):
+        # Drop finished jobs whose results have outlived the TTL
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(
+                Job.status.in_(FINISHED_STATUSES),
+                Job.expires_at < datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+runner = JobRunner()
@@ -0,0 +1,63 @@
+# app/utils/ledger.py
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.ledger import LedgerEntry, LedgerEntryType
+from app.models.models import Account
+from app.utils.archive import to_naive_utc
+
+def post_entry(
+    db: Session,
+    account_id: int,
+    entry_type: LedgerEntryType,
+    amount: float,
+    trade_id: Optional[int] = None,
+    note: Optional[str] = None
+) -> LedgerEntry:
+    """Append a ledger entry and apply it to the account balance; caller commits.
+
+    The balance is incremented in SQL rather than read into Python and
+    written back, so concurrent postings to one account cannot overwrite
+    each other. The UPDATE takes the write lock before the new balance is
+    read back for balance_after and before the entry is timestamped, so
+    entries are ordered the same way the balance changed.
+    """
+    db.query(Account).filter(Account.id == account_id).update(
+        {Account.current_balance: func.coalesce(Account.current_balance, 0.0) + amount},
+        synchronize_session="evaluate"
+    )
+    balance = db.query(Account.current_balance).filter(Account.id == account_id).scalar()
+
+    entry = LedgerEntry(
+        account_id=account_id,
+        entry_type=entry_type,
+        amount=amount,
+        balance_after=balance,
+        trade_id=trade_id,
+        note=note,
+        created_at=datetime.utcnow()
+    )
+    db.add(entry)
+    return entry
+
+def balance_at(db: Session, account: Account, at: datetime) -> float:
+    """Account balance as of `at`, found with a single index seek."""
+    at = to_naive_utc(at)
+    entries = db.query(LedgerEntry).filter(LedgerEntry.account_id == account.id)
+
+    last = entries.filter(LedgerEntry.created_at <= at).order_by(
+        LedgerEntry.created_at.desc(), LedgerEntry.id.desc()
+    ).first()
+    if last is not None:
+        return last.balance_after
+
+    # Before the first entry; accounts older than the ledger started from
+    # whatever the first entry was applied to
+    first = entries.order_by(LedgerEntry.created_at, LedgerEntry.id).first()
+    if first is not None:
+        return first.balance_after - first.amount
+
+    return account.current_balance
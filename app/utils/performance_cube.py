@@ -0,0 +1,196 @@
+# app/utils/performance_cube.py
+"""
+Precomputed performance cube over closed trades.
+
+Each cell is keyed by hour of day, weekday, direction, instrument, setup and
+emotion and holds count, sum and sum of squares of result, which is enough
+to roll up mean and standard deviation over any subset of dimensions. Trade
+writes update the affected cell incrementally; heatmaps are a single GROUP BY
+over the user's cells rather than a pass over the trades.
+
+Setup is the linked template's setup_type, falling back to its name. Emotion
+is the first tag of post_analysis["emotions"], so every trade lands in
+exactly one cell and roll-ups never double count.
+"""
+import json
+import math
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.analytics import PerformanceCell, PerformanceCubeBuild
+from app.models.job import Job, JobStatus
+from app.models.models import Account, Trade, TradeStatus, User
+from app.models.template import Template
+from app.utils.archive import query_trades, to_naive_utc
+from app.utils.jobs import JobContext, PROGRESS_INTERVAL, register_job, runner
+
+DIMENSIONS = ("hour", "weekday", "direction", "instrument", "setup", "emotion")
+
+def template_setup(template: Optional[Template]) -> str:
+    if template is None:
+        return ""
+    return template.setup_type or template.template_name or ""
+
+def primary_emotion(post_analysis: Optional[str]) -> str:
+    if not post_analysis:
+        return ""
+    try:
+        emotions = json.loads(post_analysis).get("emotions")
+    except (ValueError, AttributeError):
+        return ""
+    # The journal form sends "fear, greed"; API clients may send a list
+    if isinstance(emotions, list):
+        emotions = emotions[0] if emotions else ""
+    if not isinstance(emotions, str):
+        return ""
+    return emotions.split(",")[0].strip().lower()
+
+def trade_cell(trade: Trade, setup: str) -> Optional[dict]:
+    """Cube coordinates of a closed trade, or None if it isn't counted."""
+    if trade.status != TradeStatus.CLOSED or trade.result is None or trade.entry_date is None:
+        return None
+
+    entry_date = to_naive_utc(trade.entry_date)
+    return {
+        "hour": entry_date.hour,
+        "weekday": entry_date.weekday(),
+        "direction": trade.direction.value,
+        "instrument": trade.instrument or "",
+        "setup": setup,
+        "emotion": primary_emotion(trade.post_analysis),
+    }
+
+def apply_trade(db: Session, user_id: int, trade: Trade, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) a trade from the cube; caller commits."""
+    # Looked up by id so a just-changed template_id is honoured
+    template = db.query(Template).get(trade.template_id) if trade.template_id else None
+    cell = trade_cell(trade, template_setup(template))
+    if cell is None:
+        return
+
+    result = trade.result
+    updated = db.query(PerformanceCell).filter(
+        PerformanceCell.user_id == user_id,
+        *[getattr(PerformanceCell, name) == value for name, value in cell.items()]
+    ).update(
+        {
+            PerformanceCell.trade_count: PerformanceCell.trade_count + sign,
+            PerformanceCell.total_result: PerformanceCell.total_result + sign * result,
+            PerformanceCell.total_result_sq: PerformanceCell.total_result_sq + sign * result * result,
+        },
+        synchronize_session=False
+    )
+    if not updated and sign > 0:
+        db.add(PerformanceCell(
+            user_id=user_id,
+            trade_count=1,
+            total_result=result,
+            total_result_sq=result * result,
+            **cell
+        ))
+
+def rebuild_cube(db: Session, user_id: int, context: Optional[JobContext] = None) -> int:
+    """Recompute a user's cube from the full trade history, archive included.
+
+    Clearing the old cells comes first so the whole rebuild runs in one write
+    transaction: a trade closed meanwhile waits and is then applied on top,
+    instead of landing in cells that are about to be replaced.
+    """
+    db.query(PerformanceCell).filter(
+        PerformanceCell.user_id == user_id
+    ).delete(synchronize_session=False)
+
+    setups = {
+        template.id: template_setup(template)
+        for template in db.query(Template).filter(Template.user_id == user_id)
+    }
+
+    cells: Dict[tuple, list] = {}
+    user_accounts = select(Account.id).where(Account.user_id == user_id)
+    trades = query_trades(db, user_accounts)
+    for done, trade in enumerate(trades.yield_per(PROGRESS_INTERVAL), 1):
+        if context and done % PROGRESS_INTERVAL == 0:
+            context.check_cancelled()
+        cell = trade_cell(trade, setups.get(trade.template_id, ""))
+        if cell is None:
+            continue
+        totals = cells.setdefault(tuple(cell.values()), [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += trade.result
+        totals[2] += trade.result * trade.result
+
+    db.add_all(
+        PerformanceCell(
+            user_id=user_id,
+            trade_count=count,
+            total_result=total,
+            total_result_sq=total_sq,
+            **dict(zip(DIMENSIONS, key))
+        )
+        for key, (count, total, total_sq) in cells.items()
+    )
+    db.merge(PerformanceCubeBuild(user_id=user_id, built_at=datetime.utcnow()))
+    db.commit()
+    return len(cells)
+
+# Aggregating the whole history is CPU-bound Python, so it runs in the
+# process pool and opens its own session there
+@register_job("rebuild_performance_cube", executor="process")
+def rebuild_cube_job(params, context):
+    db = SessionLocal()
+    try:
+        return {"cells": rebuild_cube(db, context.user_id, context)}
+    finally:
+        db.close()
+
+def queue_missing_cubes(db: Session):
+    """Queue one rebuild for every user whose cube was never built.
+
+    Cells are only updated incrementally, so trades from before the cube
+    existed are missing until the first rebuild.
+    """
+    built = select(PerformanceCubeBuild.user_id)
+    pending = select(Job.user_id).where(
+        Job.job_type == "rebuild_performance_cube",
+        Job.status.in_((JobStatus.QUEUED, JobStatus.RUNNING))
+    )
+    for user_id, in db.query(User.id).filter(User.id.notin_(built), User.id.notin_(pending)).all():
+        runner.submit(db, user_id, "rebuild_performance_cube")
+
+def summarize(count: int, total: float, total_sq: float) -> dict:
+    mean = total / count if count else None
+    variance = max(total_sq / count - mean * mean, 0.0) if count else None
+    return {
+        "count": count,
+        "total": total,
+        "mean": mean,
+        "stddev": math.sqrt(variance) if variance is not None else None,
+    }
+
+def rollup(db: Session, user_id: int, group_by, filters: Optional[dict] = None) -> list:
+    """Slice the cube by `filters` and roll it up onto the `group_by` dimensions."""
+    for name in list(group_by) + list(filters or {}):
+        if name not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {name}")
+
+    columns = [getattr(PerformanceCell, name) for name in group_by]
+    query = db.query(
+        *columns,
+        func.sum(PerformanceCell.trade_count),
+        func.sum(PerformanceCell.total_result),
+        func.sum(PerformanceCell.total_result_sq)
+    ).filter(PerformanceCell.user_id == user_id)
+
+    for name, value in (filters or {}).items():
+        query = query.filter(getattr(PerformanceCell, name) == value)
+
+    rows = []
+    for *keys, count, total, total_sq in query.group_by(*columns).order_by(*columns):
+        if not count:
+            continue
+        rows.append({**dict(zip(group_by, keys)), **summarize(count, total, total_sq)})
+    return rows
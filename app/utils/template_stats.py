@@ -0,0 +1,118 @@
+# app/utils/template_stats.py
+"""
+Materialized per-template performance statistics.
+
+TemplateStats rows hold running sums over the closed trades linked to each
+template. The trade routes apply a trade's contribution in the same
+transaction that closes, deletes or relinks it, so ranking templates never
+has to scan the trade history.
+"""
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.models import Account, Trade, TradeStatus
+from app.models.template import Template, TemplateStats
+from app.utils.archive import query_trades, to_naive_utc
+from app.utils.jobs import JobContext, PROGRESS_INTERVAL, register_job
+
+STAT_COLUMNS = (
+    "trade_count", "win_count", "total_result",
+    "r_count", "total_r_multiple", "hold_count", "total_hold_seconds"
+)
+
+def trade_contribution(trade: Trade) -> Optional[dict]:
+    """What a closed trade adds to its template's totals, or None."""
+    if trade.template_id is None or trade.status != TradeStatus.CLOSED:
+        return None
+
+    result = trade.result or 0.0
+    contribution = {
+        "trade_count": 1,
+        "win_count": 1 if result > 0 else 0,
+        "total_result": result,
+        "r_count": 0,
+        "total_r_multiple": 0.0,
+        "hold_count": 0,
+        "total_hold_seconds": 0.0,
+    }
+
+    if trade.stop_loss is not None and trade.result is not None:
+        initial_risk = abs(trade.entry_price - trade.stop_loss) * trade.position_size
+        if initial_risk:
+            contribution["r_count"] = 1
+            contribution["total_r_multiple"] = trade.result / initial_risk
+
+    if trade.entry_date is not None and trade.exit_date is not None:
+        held = to_naive_utc(trade.exit_date) - to_naive_utc(trade.entry_date)
+        contribution["hold_count"] = 1
+        contribution["total_hold_seconds"] = held.total_seconds()
+
+    return contribution
+
+def apply_trade(db: Session, trade: Trade, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) a trade's contribution; caller commits."""
+    contribution = trade_contribution(trade)
+    if contribution is None:
+        return
+
+    # Increment in SQL so concurrent closes on one template don't lose updates
+    updated = db.query(TemplateStats).filter(
+        TemplateStats.template_id == trade.template_id
+    ).update(
+        {getattr(TemplateStats, name): getattr(TemplateStats, name) + sign * value
+         for name, value in contribution.items()},
+        synchronize_session=False
+    )
+    if not updated and sign > 0:
+        db.add(TemplateStats(template_id=trade.template_id, **contribution))
+
+def stats_summary(template: Template, stats: Optional[TemplateStats]) -> dict:
+    count = stats.trade_count if stats else 0
+    return {
+        "template_id": template.id,
+        "template_name": template.template_name,
+        "setup_type": template.setup_type,
+        "trade_count": count,
+        "win_rate": stats.win_count / count if count else None,
+        "expectancy": stats.total_result / count if count else None,
+        "avg_r_multiple": stats.total_r_multiple / stats.r_count if stats and stats.r_count else None,
+        "avg_hold_seconds": stats.total_hold_seconds / stats.hold_count if stats and stats.hold_count else None,
+    }
+
+def rebuild_template_stats(db: Session, user_id: int, context: Optional[JobContext] = None) -> int:
+    """Recompute every template's totals for a user from the trade history.
+
+    The old rows are deleted first so the rebuild runs in one write
+    transaction and concurrent trade writes are applied after it.
+    """
+    user_templates = select(Template.id).where(Template.user_id == user_id)
+    db.query(TemplateStats).filter(
+        TemplateStats.template_id.in_(user_templates)
+    ).delete(synchronize_session=False)
+
+    template_ids = [template_id for template_id, in db.execute(user_templates)]
+    totals = {template_id: dict.fromkeys(STAT_COLUMNS, 0) for template_id in template_ids}
+
+    user_accounts = select(Account.id).where(Account.user_id == user_id)
+    trades = query_trades(db, user_accounts)
+    for done, trade in enumerate(trades.yield_per(PROGRESS_INTERVAL), 1):
+        if context and done % PROGRESS_INTERVAL == 0:
+            context.check_cancelled()
+        contribution = trade_contribution(trade)
+        if contribution is None or trade.template_id not in totals:
+            continue
+        for name, value in contribution.items():
+            totals[trade.template_id][name] += value
+
+    db.add_all(
+        TemplateStats(template_id=template_id, **values)
+        for template_id, values in totals.items()
+    )
+    db.commit()
+    return len(template_ids)
+
+@register_job("rebuild_template_stats")
+def rebuild_template_stats_job(db, params, context):
+    return {"templates": rebuild_template_stats(db, context.user_id, context)}
@@ -0,0 +1,144 @@
+# benchmarks/ledger_stress.py
+"""
+Concurrency stress check for account balance updates.
+
+Runs against a file backed SQLite database from parallel threads:
+
+- legacy: closes every trade once with the old read-modify-write balance
+  update, which loses updates.
+- routes: fires two closes (a close and a re-close) and a delete at every
+  trade at once through the real close_trade and delete_trade routes.
+
+For the routes run the balance must equal both the ledger sum and the
+initial deposit plus the P&L of the trades that survived closed.
+
+    python -m benchmarks.ledger_stress
+"""
+import os
+import random
+import tempfile
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.ledger import LedgerEntry, LedgerEntryType
+from app.models.models import Account, Trade, TradeDirection, TradeStatus, User
+from app.models.template import Template  # noqa: F401  needed for Trade.template
+from app.routes.trades import close_trade, delete_trade
+from app.schemas.trade import TradeUpdate
+from app.utils.ledger import post_entry
+
+THREADS = 16
+TRADES_PER_THREAD = 25
+RESULT = 10.0
+RECLOSE_RESULT = 25.0
+INITIAL_BALANCE = 10000.0
+USER = User(id=1)
+
+def setup(path):
+    engine = create_engine(
+        "sqlite:///" + path, connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    # close_trade expects a get_write_db style session
+    WriteSession = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+    db = Session()
+    account = Account(user_id=USER.id, account_name="Stress", initial_balance=INITIAL_BALANCE, current_balance=0.0)
+    db.add(account)
+    db.flush()
+    post_entry(db, account.id, LedgerEntryType.DEPOSIT, INITIAL_BALANCE)
+    db.add_all(
+        Trade(account_id=account.id, entry_price=1900, position_size=1, direction=TradeDirection.LONG)
+        for _ in range(THREADS * TRADES_PER_THREAD)
+    )
+    db.commit()
+    trade_ids = [trade_id for trade_id, in db.query(Trade.id)]
+    account_id = account.id
+    db.close()
+    return Session, WriteSession, account_id, trade_ids
+
+def close_legacy(Session, WriteSession, trade_id):
+    db = Session()
+    try:
+        trade = db.query(Trade).filter(Trade.id == trade_id).first()
+        trade.status = TradeStatus.CLOSED
+        trade.result = RESULT
+        account = db.query(Account).filter(Account.id == trade.account_id).first()
+        account.current_balance += trade.result
+        db.commit()
+    finally:
+        db.close()
+
+def close_route(result):
+    def task(Session, WriteSession, trade_id):
+        db = WriteSession()
+        try:
+            close_trade(trade_id, TradeUpdate(result=result), db, USER)
+        except HTTPException:
+            pass  # deleted by a concurrent request
+        finally:
+            db.close()
+    return task
+
+def delete_route(Session, WriteSession, trade_id):
+    db = Session()
+    try:
+        delete_trade(trade_id, db, USER)
+    except HTTPException:
+        pass
+    finally:
+        db.close()
+
+def run(label, tasks_per_trade):
+    with tempfile.TemporaryDirectory() as directory:
+        Session, WriteSession, account_id, trade_ids = setup(os.path.join(directory, "stress.db"))
+        tasks = [(task, trade_id) for trade_id in trade_ids for task in tasks_per_trade]
+        # Spread each trade's tasks over different threads so they race
+        random.Random(0).shuffle(tasks)
+        chunks = [tasks[i::THREADS] for i in range(THREADS)]
+
+        def worker(chunk):
+            for task, trade_id in chunk:
+                task(Session, WriteSession, trade_id)
+
+        threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        db = Session()
+        balance = db.query(Account.current_balance).filter(Account.id == account_id).scalar()
+        ledger_total = db.query(func.sum(LedgerEntry.amount)).filter(LedgerEntry.account_id == account_id).scalar()
+        closed_total = db.query(func.sum(Trade.result)).filter(
+            Trade.account_id == account_id,
+            Trade.status == TradeStatus.CLOSED
+        ).scalar() or 0.0
+        remaining = db.query(Trade).filter(Trade.account_id == account_id).count()
+        db.close()
+
+        expected = INITIAL_BALANCE + closed_total
+        print(
+            f"{label:<7} balance={balance:.2f} expected={expected:.2f} "
+            f"ledger={ledger_total:.2f} trades_left={remaining}/{len(trade_ids)} {elapsed:.2f}s"
+        )
+        return balance, expected, ledger_total
+
+def main():
+    run("legacy", [close_legacy])
+    balance, expected, ledger_total = run(
+        "routes", [close_route(RESULT), close_route(RECLOSE_RESULT), delete_route]
+    )
+    assert balance == expected, "balance does not match the surviving closed trades"
+    assert balance == ledger_total, "ledger does not sum to the balance"
+
+if __name__ == "__main__":
+    main()
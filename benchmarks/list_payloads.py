@@ -0,0 +1,81 @@
+# benchmarks/list_payloads.py
+"""
+Compare trade list payloads with and without a `fields=` projection.
+
+Seeds an in-memory database with trades carrying realistic analysis blobs
+and reports raw and gzipped payload size plus query+serialize latency.
+
+    python -m benchmarks.list_payloads
+"""
+import gzip
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import load_only, sessionmaker
+
+from app.database import Base
+from app.models.models import Account, Trade, TradeDirection
+from app.models.template import Template  # noqa: F401  needed for Trade.template
+from app.utils.fields import parse_fields
+
+ROWS = 100
+RUNS = 50
+LIST_FIELDS = "id,entry_date,direction,entry_price,exit_price,result"
+
+def seed(db):
+    account = Account(user_id=1, account_name="Bench", initial_balance=10000, current_balance=10000)
+    db.add(account)
+    db.flush()
+
+    analysis = json.dumps({
+        "market_context": "Gold ranging below weekly resistance " * 10,
+        "entry_reason": "Liquidity sweep of the Asian low into a 15m FVG " * 10,
+        "emotions": "Calm",
+    })
+    for i in range(ROWS):
+        db.add(Trade(
+            account_id=account.id,
+            entry_price=1900 + i,
+            exit_price=1905 + i,
+            position_size=1,
+            direction=TradeDirection.LONG,
+            pre_analysis=analysis,
+            post_analysis=analysis,
+            result=5,
+        ))
+    db.commit()
+
+def full_payload(db):
+    trades = db.query(Trade).limit(ROWS).all()
+    return json.dumps(jsonable_encoder([
+        {column: getattr(trade, column) for column in Trade.__table__.columns.keys()}
+        for trade in trades
+    ])).encode()
+
+def sparse_payload(db, fields):
+    trades = db.query(Trade).options(load_only(*fields)).limit(ROWS).all()
+    return json.dumps(jsonable_encoder([
+        {name: getattr(trade, name) for name in fields} for trade in trades
+    ])).encode()
+
+def measure(label, build):
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        payload = build()
+    elapsed = (time.perf_counter() - start) / RUNS * 1000
+    print(f"{label:<8} raw={len(payload):>8}B  gzip={len(gzip.compress(payload)):>7}B  {elapsed:.2f}ms")
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    seed(db)
+
+    fields = parse_fields(LIST_FIELDS, Trade)
+    measure("full", lambda: full_payload(db))
+    measure("sparse", lambda: sparse_payload(db, fields))
+
+if __name__ == "__main__":
+    main()
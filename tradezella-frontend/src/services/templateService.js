@@ -57,13 +57,25 @@ const deleteTemplate = async (id) => {
   }
 };
 
+// Get per-template performance, best first
+const getTemplateStats = async (sortBy = 'expectancy') => {
+  try {
+    const response = await api.get(`/api/templates/stats?sort_by=${sortBy}`);
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching template stats:', error);
+    return [];
+  }
+};
+
 // Create a named object for export
 const templateService = {
   getTemplates,
   getTemplateById,
   createTemplate,
   updateTemplate,
-  deleteTemplate
+  deleteTemplate,
+  getTemplateStats
 };
 
 export default templateService;
\ No newline at end of file